@@ -23,7 +23,8 @@ AUTHOR = "somenzz"
 AUTHOR_EMAIL = "somenzz@163.com"
 URL = "https://github.com/somenzz/wechat_enterprise"
 PACKAGES = ["wechat_enterprise"]
-INSTALL_REQUIRES = ["requests", "requests_toolbelt"]
+INSTALL_REQUIRES = ["requests"]
+EXTRAS_REQUIRE = {"async": ["aiohttp"], "fast": ["orjson"]}
 TEST_SUITE = ""
 TESTS_REQUIRE = []
 
@@ -51,6 +52,7 @@ params = {
     "license": "MIT",
     "packages": PACKAGES,
     "install_requires": INSTALL_REQUIRES,
+    "extras_require": EXTRAS_REQUIRE,
     "tests_require": TESTS_REQUIRE,
     "test_suite": TEST_SUITE,
     "classifiers": CLASSIFIERS,
@@ -0,0 +1,150 @@
+import json
+import socket
+import threading
+import time
+from email.message import Message as EmailMessage
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+from wechat_enterprise import WechatEnterprise  # noqa: E402
+
+REAL_BASE_URL = WechatEnterprise.BASE_URL
+
+
+def parse_multipart(content_type, body):
+    """
+    解析只含一个文件字段的 multipart/form-data 请求体, 返回 (filename, data)
+    """
+    header = EmailMessage()
+    header["Content-Type"] = content_type
+    boundary = header.get_param("boundary").encode()
+    part = body.split(b"--" + boundary)[1]
+    assert body.endswith(b"--" + boundary + b"--\r\n")
+    head, data = part.split(b"\r\n\r\n", 1)
+    assert data.endswith(b"\r\n")
+    disposition = EmailMessage()
+    for line in head.decode("utf-8").strip().split("\r\n"):
+        key, value = line.split(":", 1)
+        disposition[key] = value.strip()
+    return disposition.get_filename(), data[:-2]
+
+
+class FakeWechatServer(ThreadingHTTPServer):
+    """
+    模拟企业微信接口, 记录收到的请求, ``statuses`` 中的状态码会依次优先返回,
+    ``None`` 表示不返回响应直接断开连接, ``dict`` 表示以 HTTP 200 返回该 JSON.
+    ``retry_after`` 不为空时在这些响应中带上 ``Retry-After``,
+    ``token_delay`` 为 ``/gettoken`` 的响应延迟 (秒)
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.requests = []
+        self.statuses = []
+        self.retry_after = None
+        self.token_delay = 0.0
+        self.lock = threading.Lock()
+
+    def paths(self, fragment):
+        return [path for method, path, headers, body in self.requests if fragment in path]
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}/cgi-bin"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, obj, retry_after=None):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if retry_after is not None:
+            self.send_header("Retry-After", str(retry_after))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        with self.server.lock:
+            self.server.requests.append((method, self.path, dict(self.headers), body))
+            status = self.server.statuses.pop(0) if self.server.statuses else 200
+        if status is None:
+            # 读完请求后直接断开连接, 模拟消息已送达但响应丢失
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return
+        if isinstance(status, dict):
+            return self._reply(200, status, self.server.retry_after)
+        if status != 200:
+            return self._reply(
+                status, {"errcode": -1, "errmsg": "busy"}, self.server.retry_after
+            )
+        if "/gettoken" in self.path:
+            time.sleep(self.server.token_delay)
+            return self._reply(
+                200,
+                {"errcode": 0, "errmsg": "ok", "access_token": "TOKEN", "expires_in": 7200},
+            )
+        if "/media/upload" in self.path:
+            return self._reply(200, {"errcode": 0, "errmsg": "ok", "media_id": "MEDIA"})
+        if "/user/getuserid" in self.path:
+            mobile = json.loads(body)["mobile"]
+            return self._reply(200, {"errcode": 0, "errmsg": "ok", "userid": f"u{mobile}"})
+        self._reply(200, {"errcode": 0, "errmsg": "ok"})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+@pytest.fixture
+def server():
+    srv = FakeWechatServer()
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def patched_urls(server, monkeypatch, tmp_path):
+    """
+    把接口地址指向本地服务, 并在临时目录中运行以隔离 ./tmp/cache.json
+    """
+    monkeypatch.chdir(tmp_path)
+    for name, value in list(vars(WechatEnterprise).items()):
+        if name.endswith("_URL") and isinstance(value, str):
+            monkeypatch.setattr(
+                WechatEnterprise, name, value.replace(REAL_BASE_URL, server.base_url)
+            )
+    return server
+
+
+@pytest.fixture
+def client(patched_urls):
+    we = WechatEnterprise(corpid="corp", appid="1000002", corpsecret="secret")
+    # 本地服务是 http, 挂载与 https 相同的 adapter 以便测试重试行为
+    we.session.mount("http://", we.session.get_adapter("https://qyapi.weixin.qq.com"))
+    yield we
+    we.close()
+
+
+def sent_messages(server):
+    return [
+        json.loads(body)
+        for method, path, headers, body in server.requests
+        if "/message/send" in path
+    ]
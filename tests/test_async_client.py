@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from conftest import REAL_BASE_URL, parse_multipart, sent_messages  # noqa: E402
+from wechat_enterprise import Message  # noqa: E402
+from wechat_enterprise.async_client import AsyncWechatEnterprise  # noqa: E402
+from wechat_enterprise.wechat_enterprise import _read_token_cache  # noqa: E402
+
+
+@pytest.fixture
+def async_client(patched_urls, monkeypatch):
+    for name, value in list(vars(AsyncWechatEnterprise).items()):
+        if name.endswith("_URL") and isinstance(value, str):
+            monkeypatch.setattr(
+                AsyncWechatEnterprise,
+                name,
+                value.replace(REAL_BASE_URL, patched_urls.base_url),
+            )
+    return AsyncWechatEnterprise(corpid="corp", appid="1000002", corpsecret="secret")
+
+
+def test_send_batch(async_client, server):
+    async def main():
+        async with async_client as we:
+            return await we.send_batch(
+                [
+                    Message("text", content="a"),
+                    Message("markdown", content="# b"),
+                    Message("text", content="c", users=["z"]),
+                ],
+                users=["x"],
+                coalesce_markdown=True,
+            )
+
+    assert asyncio.run(main()) == [True, True, True]
+    messages = sorted(sent_messages(server), key=lambda d: d["touser"])
+    assert [(d["touser"], d["msgtype"]) for d in messages] == [
+        ("x", "markdown"),
+        ("z", "text"),
+    ]
+
+
+def test_get_userids(async_client):
+    async def main():
+        async with async_client as we:
+            return await we.get_userids(["138", "139"])
+
+    assert asyncio.run(main()) == ["u138", "u139"]
+
+
+def test_send_many_records_failed_message_and_keeps_others(async_client, server):
+    async def main():
+        async with async_client as we:
+            await we.get_access_token()
+            server.statuses = [None]
+            return await we.send_many(
+                [
+                    {"msg_type": "text", "users": ["x"], "content": "a"},
+                    {"msg_type": "text", "users": ["y"], "content": "b"},
+                ]
+            )
+
+    assert sorted(asyncio.run(main())) == [False, True]
+    assert len(sent_messages(server)) == 2
+
+
+def test_send_many_validates_before_sending(async_client, server):
+    async def main():
+        async with async_client as we:
+            await we.send_many(
+                [
+                    {"msg_type": "text", "users": ["x"], "content": "a"},
+                    {"msg_type": "image", "users": ["x"]},
+                ]
+            )
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+    assert sent_messages(server) == []
+
+
+def test_upload_file_and_token_cache(async_client, server, tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"hello")
+
+    async def main():
+        async with async_client as we:
+            return await we.upload_file(str(path))
+
+    assert asyncio.run(main()) == "MEDIA"
+    assert _read_token_cache("secret")[0] == "TOKEN"
+    ((headers, body),) = [
+        (headers, body)
+        for method, p, headers, body in server.requests
+        if "/media/upload" in p
+    ]
+    assert parse_multipart(headers["Content-Type"], body) == ("a.txt", b"hello")
+
+
+def test_send_dedups_and_splits_touser(async_client, server):
+    users = [f"u{i}" for i in range(2500)]
+
+    async def main():
+        async with async_client as we:
+            return await we.send_text("hi", users + users[:300] + ["u2499"])
+
+    assert asyncio.run(main()) is True
+    batches = [m["touser"].split("|") for m in sent_messages(server)]
+    assert sorted(len(b) for b in batches) == [500, 1000, 1000]
+    ids = [u for b in batches for u in b]
+    assert len(ids) == len(set(ids)) == len(users)
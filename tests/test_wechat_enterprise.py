@@ -0,0 +1,393 @@
+import os
+import threading
+import time
+
+import pytest
+import requests
+
+from conftest import parse_multipart, sent_messages
+from wechat_enterprise import Message, RateLimited, WechatEnterprise
+from wechat_enterprise import wechat_enterprise as wechat_module
+from wechat_enterprise.wechat_enterprise import (
+    _MultipartReader,
+    _read_token_cache,
+    _write_token_cache,
+)
+
+
+def test_send_batch_keeps_single_message_type(client, server):
+    results = client.send_batch(
+        [Message("text", content="c", users=["z"])], coalesce_markdown=True
+    )
+
+    assert results == [True]
+    (data,) = sent_messages(server)
+    assert data["msgtype"] == "text"
+    assert data["text"] == {"content": "c"}
+
+
+def test_send_batch_coalesces_group_into_markdown(client, server):
+    results = client.send_batch(
+        [Message("text", content="a"), Message("markdown", content="# b")],
+        users=["y", "x"],
+        coalesce_markdown=True,
+    )
+
+    assert results == [True, True]
+    (data,) = sent_messages(server)
+    assert data["msgtype"] == "markdown"
+    assert data["markdown"] == {"content": "a\n\n---\n\n# b"}
+    assert data["touser"] == "x|y"
+
+
+def test_send_batch_rejects_missing_content_before_sending(client, server):
+    with pytest.raises(ValueError):
+        client.send_batch(
+            [Message("text", content="a"), Message("markdown", content=None)],
+            users=["x"],
+            coalesce_markdown=True,
+        )
+
+    assert sent_messages(server) == []
+
+
+def _upload_requests(server):
+    return [
+        (headers, body)
+        for method, path, headers, body in server.requests
+        if "/media/upload" in path
+    ]
+
+
+def test_upload_streams_large_file_byte_identical(client, server, tmp_path):
+    data = os.urandom(WechatEnterprise.STREAM_UPLOAD_THRESHOLD * 3 + 7)
+    path = tmp_path / "big.bin"
+    path.write_bytes(data)
+
+    assert client.upload_file(str(path)) == "MEDIA"
+
+    ((headers, body),) = _upload_requests(server)
+    assert "Transfer-Encoding" not in headers
+    assert int(headers["Content-Length"]) == len(body)
+    assert parse_multipart(headers["Content-Type"], body) == ("big.bin", data)
+
+
+def test_upload_rewinds_streamed_body_on_503(client, server, tmp_path):
+    data = os.urandom(WechatEnterprise.STREAM_UPLOAD_THRESHOLD + 1)
+    path = tmp_path / "big.bin"
+    path.write_bytes(data)
+    server.statuses = [503]
+
+    assert client.upload_file(str(path)) == "MEDIA"
+
+    uploads = _upload_requests(server)
+    assert len(uploads) == 2
+    for headers, body in uploads:
+        assert parse_multipart(headers["Content-Type"], body) == ("big.bin", data)
+
+
+@pytest.mark.parametrize(
+    "filename", ['a "b" \\c.txt', "a\r\nX-Evil: 1\r\n.txt", "中文 名.txt"]
+)
+def test_multipart_reader_escapes_filename_like_requests(tmp_path, filename):
+    path = tmp_path / "f.txt"
+    path.write_bytes(b"hello")
+
+    with open(path, "rb") as f:
+        reader = _MultipartReader(f, "file", filename, "text/plain")
+        body = b"".join(bytes(chunk) for chunk in iter(reader.read, b""))
+
+    assert len(body) == len(reader)
+    head, data = body.split(b"\r\n\r\n", 1)
+    assert data == b"hello\r\n--" + reader.boundary.encode() + b"--\r\n"
+    # 只有分隔行、Content-Disposition 和 Content-Type 三行, 没有被注入的头部
+    lines = head.split(b"\r\n")
+    assert len(lines) == 3
+
+    # 与小文件使用的 requests files= 路径生成的 Content-Disposition 完全一致
+    expected = requests.Request(
+        "POST", "http://localhost/", files={"file": (filename, b"hello", "text/plain")}
+    ).prepare().body
+    expected_disposition = [
+        line for line in expected.split(b"\r\n") if line.startswith(b"Content-Disposition")
+    ]
+    assert [lines[1]] == expected_disposition
+
+
+@pytest.fixture
+def empty_pool():
+    pool = _MultipartReader._BUF_POOL
+    while not pool.empty():
+        pool.get_nowait()
+    yield pool
+    while not pool.empty():
+        pool.get_nowait()
+
+
+def _write_chunks(tmp_path, n_chunks):
+    data = os.urandom(_MultipartReader.CHUNK_SIZE * n_chunks + 11)
+    path = tmp_path / "f.bin"
+    path.write_bytes(data)
+    return path, data
+
+
+def test_pooled_buffer_reused_across_chunks(tmp_path, empty_pool):
+    path, data = _write_chunks(tmp_path, 3)
+
+    with open(path, "rb") as f:
+        reader = _MultipartReader(f, "file", "f.bin", "application/octet-stream")
+        chunks, buffers = [], set()
+        for chunk in iter(reader.read, b""):
+            # 模拟调用方: 每块在读取下一块之前就已发送 (这里是复制) 完毕
+            chunks.append(bytes(chunk))
+            if isinstance(chunk, memoryview):
+                buffers.add(id(chunk.obj))
+
+    assert len(buffers) == 1
+    assert parse_multipart(reader.content_type, b"".join(chunks)) == ("f.bin", data)
+    assert empty_pool.qsize() == 1
+
+    with open(path, "rb") as f:
+        reader = _MultipartReader(f, "file", "f.bin", "application/octet-stream")
+        for _ in iter(reader.read, b""):
+            pass
+    assert empty_pool.qsize() == 1
+
+
+def test_pooled_buffer_returned_on_seek_and_close(tmp_path, empty_pool):
+    path, data = _write_chunks(tmp_path, 3)
+
+    with open(path, "rb") as f:
+        reader = _MultipartReader(f, "file", "f.bin", "application/octet-stream")
+        reader.read()
+        reader.read()
+        assert empty_pool.qsize() == 0
+
+        assert reader.seek(0) == 0
+        assert empty_pool.qsize() == 1
+        body = b"".join(bytes(chunk) for chunk in iter(reader.read, b""))
+        assert parse_multipart(reader.content_type, body) == ("f.bin", data)
+        assert empty_pool.qsize() == 1
+
+        reader.seek(0)
+        reader.read()
+        reader.read()
+        assert empty_pool.qsize() == 0
+        reader.close()
+
+    assert empty_pool.qsize() == 1
+
+
+def test_send_is_not_resent_after_read_error(client, server):
+    server.statuses = [None]
+
+    with pytest.raises(requests.ConnectionError):
+        client.send_text("once", ["x"])
+
+    assert len(sent_messages(server)) == 1
+
+
+def test_send_is_retried_on_503(client, server):
+    server.statuses = [503]
+
+    assert client.send_text("hi", ["x"])
+    assert len(sent_messages(server)) == 2
+
+
+def test_concurrent_token_cache_writes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    errors = []
+
+    def writer(n):
+        for i in range(300):
+            try:
+                _write_token_cache("secret", f"token-{n}-{i}", 7000)
+            except Exception as e:  # pragma: no cover - 失败时才会执行
+                errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    access_token, remaining = _read_token_cache("secret")
+    assert access_token.startswith("token-")
+    assert remaining > 0
+    assert [p.name for p in (tmp_path / "tmp").iterdir()] == ["cache.json"]
+
+
+def test_unknown_msg_type_error_is_not_chained(client, server):
+    with pytest.raises(ValueError) as excinfo:
+        client.send("news", ["x"], content="c")
+
+    assert excinfo.value.__cause__ is None
+    assert excinfo.value.__suppress_context__
+    assert sent_messages(server) == []
+
+
+def _expire_token(client, tmp_path):
+    client._token_expires_monotonic = time.monotonic() - 1
+    (tmp_path / "tmp" / "cache.json").unlink()
+
+
+def test_access_token_memory_hit_skips_file(client, server, monkeypatch):
+    def fail(corpsecret):
+        raise AssertionError("token cache file should not be read")
+
+    monkeypatch.setattr(wechat_module, "_read_token_cache", fail)
+
+    assert client.get_access_token() == "TOKEN"
+    assert client.access_token == "TOKEN"
+    assert len(server.paths("/gettoken")) == 1
+
+
+def test_access_token_cold_start_from_file(patched_urls, server):
+    _write_token_cache("secret", "CACHED", 7000)
+
+    we = WechatEnterprise(corpid="corp", appid="1000002", corpsecret="secret")
+    try:
+        assert we.access_token == "CACHED"
+        assert 6900 < we._token_expires_monotonic - time.monotonic() <= 7000
+    finally:
+        we.close()
+    assert server.paths("/gettoken") == []
+
+
+def test_access_token_refreshed_after_expiry(client, server, tmp_path):
+    assert len(server.paths("/gettoken")) == 1
+    _expire_token(client, tmp_path)
+
+    assert client.get_access_token() == "TOKEN"
+    assert len(server.paths("/gettoken")) == 2
+    assert _read_token_cache("secret")[0] == "TOKEN"
+
+
+def test_access_token_refresh_is_single_flight(client, server, tmp_path):
+    _expire_token(client, tmp_path)
+    server.token_delay = 0.2
+    n_threads = 8
+    barrier = threading.Barrier(n_threads)
+    tokens = []
+
+    def worker():
+        barrier.wait()
+        tokens.append(client.get_access_token())
+
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert tokens == ["TOKEN"] * n_threads
+    # 第一次是创建客户端时获取的, 过期后只应再请求一次
+    assert len(server.paths("/gettoken")) == 2
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(wechat_module.time, "sleep", delays.append)
+    monkeypatch.setattr(wechat_module.random, "uniform", lambda a, b: 1.0)
+    return delays
+
+
+def test_rate_limit_errcode_is_retried_with_backoff(client, server, sleeps):
+    server.statuses = [{"errcode": 45009, "errmsg": "api freq out of limit"}]
+
+    assert client.send_text("hi", ["x"])
+    assert len(sent_messages(server)) == 2
+    assert sleeps == [1.0]
+
+
+def test_rate_limit_honours_retry_after(client, server, sleeps):
+    server.statuses = [{"errcode": -1, "errmsg": "system busy"}]
+    server.retry_after = 3
+
+    assert client.send_text("hi", ["x"])
+    assert sleeps == [3.0]
+
+
+def test_rate_limit_reraised_after_last_attempt(client, server, sleeps):
+    server.statuses = [{"errcode": 45034, "errmsg": "limit"}] * 5
+
+    with pytest.raises(RateLimited):
+        client.send_text("hi", ["x"])
+    assert len(sent_messages(server)) == 5
+    assert sleeps == [1.0, 2.0, 4.0, 8.0]
+
+
+def test_send_batch_coalesced_content_stays_under_limit(client, server):
+    # 每条 1000 字节, 两条合并后约 2 KB, 四条需要分成两次合并发送
+    contents = ["一" * 333 + "a", "b" * 1000, "c" * 1000, "d" * 1000]
+    results = client.send_batch(
+        [Message("text", content=c) for c in contents],
+        users=["x"],
+        coalesce_markdown=True,
+    )
+
+    assert results == [True] * 4
+    messages = sorted(sent_messages(server), key=lambda m: m["markdown"]["content"])
+    assert [m["msgtype"] for m in messages] == ["markdown", "markdown"]
+    assert [m["markdown"]["content"] for m in messages] == [
+        "\n\n---\n\n".join(contents[2:]),
+        "\n\n---\n\n".join(contents[:2]),
+    ]
+    for m in messages:
+        assert len(m["markdown"]["content"].encode("utf-8")) <= 2048
+
+
+def test_send_batch_records_failed_group_and_keeps_others(client, server):
+    server.statuses = [None]
+
+    results = client.send_batch(
+        [Message("text", content="a", users=["x"]), Message("text", content="b", users=["y"])]
+    )
+
+    assert sorted(results) == [False, True]
+    # 连接中断的那一组不会被重发
+    assert len(sent_messages(server)) == 2
+
+
+def _touser_batches(server):
+    return [m["touser"].split("|") for m in sent_messages(server)]
+
+
+def test_send_dedups_and_splits_touser(client, server):
+    users = [f"u{i}" for i in range(2500)]
+    result = client.send_text("hi", users + users[:300] + ["u2499"])
+
+    assert result is True
+    batches = _touser_batches(server)
+    assert sorted(len(b) for b in batches) == [500, 1000, 1000]
+    ids = [u for b in batches for u in b]
+    assert len(ids) == len(set(ids))
+    assert set(ids) == set(users)
+
+
+@pytest.mark.parametrize("failing", ["write", "replace"])
+def test_token_cache_temp_file_removed_on_failure(tmp_path, monkeypatch, failing):
+    monkeypatch.chdir(tmp_path)
+
+    def fail(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    if failing == "write":
+        real = wechat_module.tempfile.NamedTemporaryFile
+
+        def named_temporary_file(*args, **kwargs):
+            tmp = real(*args, **kwargs)
+            tmp.write = fail
+            return tmp
+
+        monkeypatch.setattr(
+            wechat_module.tempfile, "NamedTemporaryFile", named_temporary_file
+        )
+    else:
+        monkeypatch.setattr(wechat_module.os, "replace", fail)
+
+    with pytest.raises(OSError):
+        _write_token_cache("secret", "TOKEN", 7000)
+    assert list((tmp_path / "tmp").iterdir()) == []
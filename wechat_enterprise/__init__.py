@@ -1,3 +1,3 @@
-from .wechat_enterprise import WechatEnterprise
+from .wechat_enterprise import Message, RateLimited, WechatEnterprise
 
-__all__ = ["WechatEnterprise"]
+__all__ = ["WechatEnterprise", "Message", "RateLimited"]
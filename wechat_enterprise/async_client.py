@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import aiohttp
+except ImportError:
+    raise ImportError(
+        'Could not import "aiohttp". '
+        'Please install it with "pip install wechat-enterprise-sdk[async]".'
+    )
+
+from .wechat_enterprise import (
+    Message,
+    RETRYABLE_ERRCODES,
+    RETRYABLE_STATUS_CODES,
+    RateLimited,
+    WechatEnterprise,
+    _backoff_delay,
+    _build_payload,
+    _dumps,
+    _file_meta,
+    _join_users,
+    _loads,
+    _parse_retry_after,
+    _plan_batch,
+    _read_token_cache,
+    _write_token_cache,
+)
+
+
+class AsyncWechatEnterprise:
+    """
+    企业微信消息推送 (asyncio 版本)
+    """
+
+    __slots__ = (
+        "corpid",
+        "appid",
+        "corpsecret",
+        "concurrency",
+        "_session",
+        "_access_token",
+        "_token_expires_monotonic",
+        "_token_lock",
+    )
+
+    UPLOAD_URL = WechatEnterprise.UPLOAD_URL
+    SEND_URL = WechatEnterprise.SEND_URL
+    TOKEN_URL = WechatEnterprise.TOKEN_URL
+    GET_USER_URL = WechatEnterprise.GET_USER_URL
+    GET_USERID_URL = WechatEnterprise.GET_USERID_URL
+    GET_DEPARTMENT_URL = WechatEnterprise.GET_DEPARTMENT_URL
+    GET_DEPARTMENT_USERLIST_URL = WechatEnterprise.GET_DEPARTMENT_USERLIST_URL
+    TOKEN_EXPIRATION_BUFFER = WechatEnterprise.TOKEN_EXPIRATION_BUFFER
+    MAX_TOUSER = WechatEnterprise.MAX_TOUSER
+
+    def __init__(
+        self, corpid: str, appid: str, corpsecret: str, concurrency: int = 8
+    ) -> None:
+        """
+        初始化消息通知应用, access_token 在第一次调用接口时获取
+
+        Parameters
+        ----------
+        corpid : str
+            企业 ID
+        appid : str
+            应用 ID (企业微信网页后台应用管理界面的 AgentId)
+        corpsecret : str
+            应用 Secret (企业微信网页后台应用管理界面的 Secret)
+        concurrency : int, optional
+            ``send_many`` 同时进行的请求数, 默认为 8
+        """
+        self.corpid = corpid
+        self.appid = appid
+        self.corpsecret = corpsecret
+        self.concurrency = concurrency
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._access_token: Optional[str] = None
+        self._token_expires_monotonic: float = 0.0
+        self._token_lock = asyncio.Lock()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # ClientSession 需要在事件循环中创建, 因此延迟到第一次使用时
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=16, ttl_dns_cache=300)
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """
+        关闭底层的 HTTP 连接池
+        """
+        if self._session is not None:
+            await self._session.close()
+
+    async def __aenter__(self) -> AsyncWechatEnterprise:
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def _handle_api_response(
+        self, response: aiohttp.ClientResponse
+    ) -> Dict[str, Any]:
+        if response.status in RETRYABLE_STATUS_CODES:
+            raise RateLimited(f"HTTP {response.status}", _parse_retry_after(response))
+        response.raise_for_status()
+        js: dict = _loads(await response.read())
+        if js.get("errcode") in RETRYABLE_ERRCODES:
+            raise RateLimited(js.get("errmsg", ""), _parse_retry_after(response))
+        return js
+
+    async def _retry(
+        self,
+        fn,
+        *,
+        max_attempts: int = 5,
+        base: float = 1.0,
+        cap: float = 30.0,
+    ) -> Any:
+        """
+        同 ``WechatEnterprise._retry``, ``fn`` 为返回协程的函数
+        """
+        for attempt in range(max_attempts):
+            try:
+                return await fn()
+            except RateLimited as e:
+                if attempt == max_attempts - 1:
+                    raise
+                await asyncio.sleep(_backoff_delay(attempt, base, cap, e.retry_after))
+
+    async def _api_get(self, url: str, **kwargs) -> Dict[str, Any]:
+        async def _get() -> Dict[str, Any]:
+            async with self.session.get(url, **kwargs) as response:
+                return await self._handle_api_response(response)
+
+        return await self._retry(_get)
+
+    async def _api_post(self, url: str, **kwargs) -> Dict[str, Any]:
+        async def _post() -> Dict[str, Any]:
+            async with self.session.post(url, **kwargs) as response:
+                return await self._handle_api_response(response)
+
+        return await self._retry(_post)
+
+    async def get_access_token(self) -> str:
+        """
+        获取 access_token, 优先使用内存缓存, 其次是 ./tmp/cache.json
+
+        Returns
+        -------
+        str
+            企业微信程序 token
+        """
+        if self._access_token and time.monotonic() < self._token_expires_monotonic:
+            return self._access_token
+        async with self._token_lock:
+            if self._access_token and time.monotonic() < self._token_expires_monotonic:
+                return self._access_token
+            return await self._refresh_access_token()
+
+    async def _refresh_access_token(self) -> str:
+        # 读写 ./tmp/cache.json 放到线程中执行, 避免阻塞事件循环
+        cached = await asyncio.to_thread(_read_token_cache, self.corpsecret)
+        if cached is not None:
+            self._access_token, remaining = cached
+            self._token_expires_monotonic = time.monotonic() + remaining
+            return self._access_token
+
+        access_token, expires_in = await self._fetch_access_token()
+        valid_seconds = expires_in - self.TOKEN_EXPIRATION_BUFFER
+        self._access_token = access_token
+        self._token_expires_monotonic = time.monotonic() + valid_seconds
+        await asyncio.to_thread(
+            _write_token_cache, self.corpsecret, access_token, valid_seconds
+        )
+        return access_token
+
+    async def _fetch_access_token(self) -> Tuple[str, int]:
+        params = {"corpid": self.corpid, "corpsecret": self.corpsecret}
+        js = await self._api_get(self.TOKEN_URL, params=params)
+        access_token = js.get("access_token")
+        if access_token is None:
+            raise Exception("获取 token 失败，请确保相关信息填写正确")
+        return access_token, int(js.get("expires_in", 7200))
+
+    async def get_department_id(self, ID=0):
+        params = {"access_token": await self.get_access_token(), "id": ID}
+        return await self._api_get(self.GET_DEPARTMENT_URL, params=params)
+
+    async def get_department_userlist(self, department_id=1):
+        params = {
+            "access_token": await self.get_access_token(),
+            "department_id": department_id,
+        }
+        return await self._api_get(self.GET_DEPARTMENT_USERLIST_URL, params=params)
+
+    async def get_user_info(self, userid):
+        params = {"access_token": await self.get_access_token(), "userid": userid}
+        return await self._api_get(self.GET_USER_URL, params=params)
+
+    async def upload_file(self, filepath: str, filename: Optional[str] = None) -> str:
+        """
+        上传文件, 参数同 ``WechatEnterprise.upload_file``
+        """
+        params = {"access_token": await self.get_access_token(), "type": "file"}
+        stat = await asyncio.to_thread(os.stat, filepath)
+        name, ctype = _file_meta(str(filepath), stat.st_mtime_ns)
+        filename = filename or name
+
+        async def _upload() -> Dict[str, Any]:
+            # aiohttp 会在线程池中按块读取文件对象, 每次重试都重新打开文件
+            f = await asyncio.to_thread(open, filepath, "rb")
+            try:
+                form = aiohttp.FormData()
+                form.add_field("file", f, filename=filename, content_type=ctype)
+                async with self.session.post(
+                    self.UPLOAD_URL, params=params, data=form
+                ) as response:
+                    return await self._handle_api_response(response)
+            finally:
+                f.close()
+
+        js = await self._retry(_upload)
+        if js["errmsg"] != "ok":
+            return ""
+        return js["media_id"]
+
+    async def send(
+        self, msg_type: str, users: List[str], content: str = None, media_id: str = None
+    ) -> bool:
+        """
+        发送消息, 参数同 ``WechatEnterprise.send``
+        """
+        payload = _build_payload(msg_type, content, media_id)
+        uniq = list(dict.fromkeys(users))
+        if len(uniq) <= self.MAX_TOUSER:
+            return await self._post_one(uniq, msg_type, payload)
+        results = await asyncio.gather(
+            *[
+                self._post_one(uniq[i : i + self.MAX_TOUSER], msg_type, payload)
+                for i in range(0, len(uniq), self.MAX_TOUSER)
+            ]
+        )
+        return all(results)
+
+    async def _post_one(
+        self, users: List[str], msg_type: str, payload: Dict[str, str]
+    ) -> bool:
+        data = {
+            **WechatEnterprise._DEFAULTS,
+            "touser": _join_users(tuple(users)),
+            "msgtype": msg_type,
+            "agentid": self.appid,
+            msg_type: payload,
+        }
+        params = {"access_token": await self.get_access_token()}
+        js = await self._api_post(
+            self.SEND_URL,
+            params=params,
+            data=_dumps(data),
+            headers={"Content-Type": "application/json"},
+        )
+        return js["errmsg"] == "ok"
+
+    async def send_many(self, msgs: List[Dict[str, Any]]) -> List[bool]:
+        """
+        并发发送多条消息, 同时进行的请求数不超过 ``concurrency``
+
+        Parameters
+        ----------
+        msgs : List[Dict[str, Any]]
+            每一项为 ``send`` 的关键字参数,
+            例如 ``{"msg_type": "text", "users": ["ZhangSan"], "content": "hi"}``
+
+        Returns
+        -------
+        List[bool]
+            与 ``msgs`` 一一对应的发送结果. 某条消息请求出错 (如重试耗尽、
+            连接中断) 时记为 ``False``, 其余消息的结果不受影响
+
+        Raises
+        ------
+        ValueError
+            消息类型不支持或缺少内容时, 此时不会发送任何消息
+        """
+        # 发送前先校验全部消息, 避免只发出一部分
+        for msg in msgs:
+            _build_payload(msg["msg_type"], msg.get("content"), msg.get("media_id"))
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _send(msg: Dict[str, Any]) -> bool:
+            async with semaphore:
+                return await self.send(**msg)
+
+        results = await asyncio.gather(*[_send(m) for m in msgs], return_exceptions=True)
+        sent: List[bool] = []
+        for result in results:
+            if isinstance(result, BaseException):
+                print(f"send failed: {str(result)}")
+                result = False
+            sent.append(result)
+        return sent
+
+    async def send_batch(
+        self,
+        messages: List[Message],
+        users: Optional[List[str]] = None,
+        coalesce_markdown: bool = False,
+    ) -> List[bool]:
+        """
+        批量发送消息, 参数同 ``WechatEnterprise.send_batch``
+        """
+        plan = _plan_batch(messages, users, coalesce_markdown)
+        sent = await self.send_many([kwargs for _, kwargs in plan])
+        results: List[bool] = [False] * len(messages)
+        for (indexes, _), ok in zip(plan, sent):
+            for i in indexes:
+                results[i] = ok
+        return results
+
+    async def send_image(self, image_path: str, users: List[str]) -> bool:
+        media_id = await self.upload_file(image_path)
+        return await self.send(msg_type="image", users=users, media_id=media_id)
+
+    async def send_file(self, file_path: str, users: List[str]) -> bool:
+        media_id = await self.upload_file(file_path)
+        return await self.send(msg_type="file", users=users, media_id=media_id)
+
+    async def send_text(self, content: str, users: List[str]) -> bool:
+        return await self.send(msg_type="text", users=users, content=content)
+
+    async def send_markdown(self, content: str, users: List[str]) -> bool:
+        return await self.send(msg_type="markdown", users=users, content=content)
+
+    async def get_userid(self, telephone):
+        params = {"access_token": await self.get_access_token()}
+        res = await self._api_post(
+            self.GET_USERID_URL, params=params, json={"mobile": telephone}
+        )
+        if res["errmsg"] == "ok":
+            return res.get("userid")
+        else:
+            raise Exception(res["errmsg"])
+
+    async def get_userids(self, telephones: List[str]) -> List[str]:
+        """
+        根据多个手机号并发获取企业微信账号, 参数同 ``WechatEnterprise.get_userids``
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _get(telephone: str) -> str:
+            async with semaphore:
+                return await self.get_userid(telephone)
+
+        return list(await asyncio.gather(*[_get(t) for t in telephones]))
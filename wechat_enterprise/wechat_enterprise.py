@@ -1,9 +1,365 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
-import requests
+import functools
+import mimetypes
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+import uuid
 import json
 from datetime import timedelta, datetime
-from requests_toolbelt import MultipartEncoder
+
+if TYPE_CHECKING:
+    import requests
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+# 可重试的 HTTP 状态码及企业微信错误码（系统繁忙 / 接口调用超过限制）
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_ERRCODES = {-1, 45009, 45034}
+# 文本 / Markdown 消息内容最长 2048 字节 (UTF-8)
+MAX_CONTENT_BYTES = 2048
+# send_batch 合并多条消息时使用的分隔符
+COALESCE_SEPARATOR = "\n\n---\n\n"
+
+
+class RateLimited(Exception):
+    """
+    企业微信接口限流或系统繁忙，可稍后重试
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class Message:
+    """
+    待发送的一条消息, 用于 ``WechatEnterprise.send_batch``
+
+    Parameters
+    ----------
+    msg_type : str
+        消息类型, 同 ``WechatEnterprise.send``
+    content : str, optional
+        消息内容
+    media_id : str, optional
+        文件 ID
+    users : List[str], optional
+        接受消息的用户账号列表, 为空时使用 ``send_batch`` 的 ``users`` 参数
+    """
+
+    msg_type: str
+    content: Optional[str] = None
+    media_id: Optional[str] = None
+    users: Optional[List[str]] = None
+
+
+class _MultipartReader:
+    """
+    以流的方式生成只含一个文件字段的 multipart/form-data 请求体,
+    发送时按块读取文件, 不会把整个文件读入内存
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    # 复用读文件的缓冲区, 批量发送图片 / 文件时不必每次重新分配
+    _BUF_POOL: queue.LifoQueue[bytearray] = queue.LifoQueue(maxsize=8)
+
+    def __init__(
+        self, f: BinaryIO, field: str, filename: str, content_type: str
+    ) -> None:
+        # 与 requests 的 files= 路径使用同一种转义, 两种上传方式发出的文件名一致,
+        # 且文件名中的换行等控制字符无法注入额外的头部
+        try:
+            from urllib3.fields import format_multipart_header_param as format_param
+        except ImportError:  # urllib3 < 2
+            from urllib3.fields import format_header_param_html5 as format_param
+
+        self.boundary = uuid.uuid4().hex
+        disposition = "; ".join(
+            ["form-data", format_param("name", field), format_param("filename", filename)]
+        )
+        self._head = (
+            f"--{self.boundary}\r\n"
+            f"Content-Disposition: {disposition}\r\n"
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode("utf-8")
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode("utf-8")
+        self._file = f
+        self._start = f.tell()
+        size = os.fstat(f.fileno()).st_size - self._start
+        self._length = len(self._head) + size + len(self._tail)
+        self._position = 0
+        self._chunks = self._iter_chunks()
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _iter_chunks(self) -> Iterator[bytes]:
+        yield self._head
+        try:
+            buf = self._BUF_POOL.get_nowait()
+        except queue.Empty:
+            buf = bytearray(self.CHUNK_SIZE)
+        try:
+            view = memoryview(buf)
+            while True:
+                n = self._file.readinto(buf)
+                if not n:
+                    break
+                # 调用方发送完这一块才会读取下一块, 因此可以安全地复用 buf
+                yield view[:n]
+        finally:
+            try:
+                self._BUF_POOL.put_nowait(buf)
+            except queue.Full:
+                pass
+        yield self._tail
+
+    def read(self, size: int = -1) -> bytes:
+        # 每次返回下一块数据, 忽略 size, 读完返回 b""
+        chunk = next(self._chunks, b"")
+        self._position += len(chunk)
+        return chunk
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        # 只支持回到开头, urllib3 重试请求前会以此重置请求体
+        if offset != 0 or whence != 0:
+            raise OSError("_MultipartReader can only seek to the start")
+        self._chunks.close()
+        self._file.seek(self._start)
+        self._position = 0
+        self._chunks = self._iter_chunks()
+        return 0
+
+    def close(self) -> None:
+        self._chunks.close()
+
+
+@functools.lru_cache(maxsize=256)
+def _file_meta(path_str: str, mtime_ns: int) -> Tuple[str, str]:
+    # mtime_ns 只参与缓存的 key, 文件被修改后重新计算
+    p = Path(path_str)
+    return p.name, mimetypes.guess_type(p.name)[0] or "application/octet-stream"
+
+
+@functools.lru_cache(maxsize=128)
+def _join_users(users: Tuple[str, ...]) -> str:
+    return "|".join(users)
+
+
+def _require(value: Optional[str], name: str) -> str:
+    if value is None:
+        raise ValueError(f"缺少参数 {name}")
+    return value
+
+
+# 各消息类型对应的消息体, 新增类型时在这里注册即可
+_PAYLOAD_BUILDERS: Dict[str, Callable[[Optional[str], Optional[str]], Dict[str, str]]] = {
+    "text": lambda c, m: {"content": _require(c, "content")},
+    "markdown": lambda c, m: {"content": _require(c, "content")},
+    "image": lambda c, m: {"media_id": _require(m, "media_id")},
+    "file": lambda c, m: {"media_id": _require(m, "media_id")},
+    "voice": lambda c, m: {"media_id": _require(m, "media_id")},
+    "video": lambda c, m: {"media_id": _require(m, "media_id")},
+}
+
+
+def _build_payload(
+    msg_type: str, content: Optional[str], media_id: Optional[str]
+) -> Dict[str, str]:
+    try:
+        builder = _PAYLOAD_BUILDERS[msg_type]
+    except KeyError:
+        raise ValueError(f"不支持的消息类型: {msg_type}") from None
+    return builder(content, media_id)
+
+
+def _backoff_delay(
+    attempt: int, base: float, cap: float, retry_after: Optional[float]
+) -> float:
+    # 指数退避加随机抖动, 服务端给出 Retry-After 时以其为准
+    if retry_after is not None:
+        return retry_after
+    return min(cap, base * 2**attempt) * random.uniform(0.5, 1.5)
+
+
+def _plan_batch(
+    messages: List[Message], users: Optional[List[str]], coalesce_markdown: bool
+) -> List[Tuple[List[int], Dict[str, Any]]]:
+    """
+    按接收者给 ``send_batch`` 的消息分组
+
+    Returns
+    -------
+    List[Tuple[List[int], Dict[str, Any]]]
+        每一项为 (对应的消息下标, ``send`` 的关键字参数)
+    """
+    groups: Dict[Tuple[str, ...], List[int]] = {}
+    for i, message in enumerate(messages):
+        receivers = message.users if message.users is not None else users
+        if not receivers:
+            raise ValueError(f"消息 {i} 未指定接收者")
+        # 发送前先校验全部消息, 避免合并时 content 为空或只发出一部分
+        _build_payload(message.msg_type, message.content, message.media_id)
+        groups.setdefault(tuple(sorted(receivers)), []).append(i)
+
+    plan: List[Tuple[List[int], Dict[str, Any]]] = []
+    for receivers, indexes in groups.items():
+        if coalesce_markdown and all(
+            messages[i].msg_type in ("text", "markdown") for i in indexes
+        ):
+            chunks = _coalesce_contents([messages[i].content for i in indexes])
+            chunks = [[indexes[j] for j in chunk] for chunk in chunks]
+        else:
+            chunks = [[i] for i in indexes]
+        for chunk in chunks:
+            if len(chunk) > 1:
+                content = COALESCE_SEPARATOR.join(messages[i].content for i in chunk)
+                kwargs = {"msg_type": "markdown", "users": list(receivers), "content": content}
+                plan.append((chunk, kwargs))
+                continue
+            m = messages[chunk[0]]
+            plan.append(
+                (
+                    chunk,
+                    {
+                        "msg_type": m.msg_type,
+                        "users": list(receivers),
+                        "content": m.content,
+                        "media_id": m.media_id,
+                    },
+                )
+            )
+    return plan
+
+
+def _coalesce_contents(contents: List[str]) -> List[List[int]]:
+    """
+    按顺序把消息内容贪心地分段, 每段合并后不超过 ``MAX_CONTENT_BYTES`` 字节
+
+    Returns
+    -------
+    List[List[int]]
+        每段包含的 ``contents`` 下标, 单条超长的内容独占一段
+    """
+    separator_size = len(COALESCE_SEPARATOR.encode("utf-8"))
+    chunks: List[List[int]] = []
+    chunk: List[int] = []
+    size = 0
+    for i, content in enumerate(contents):
+        content_size = len(content.encode("utf-8"))
+        if chunk and size + separator_size + content_size > MAX_CONTENT_BYTES:
+            chunks.append(chunk)
+            chunk, size = [], 0
+        size += content_size + (separator_size if chunk else 0)
+        chunk.append(i)
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+TOKEN_CACHE = Path("./tmp/cache.json")
+
+
+def _read_token_cache(corpsecret: str) -> Optional[Tuple[str, float]]:
+    """
+    读取 ./tmp/cache.json 中仍然有效的 access_token
+
+    Returns
+    -------
+    Optional[Tuple[str, float]]
+        access_token 及其剩余有效秒数, 缓存不存在或已过期时为 ``None``
+    """
+    cache = TOKEN_CACHE
+    cache.parent.mkdir(exist_ok=True)
+    if cache.exists():
+        try:
+            cache_dict: dict = json.loads(cache.read_text())
+            token_valid_time = datetime.strptime(
+                cache_dict["token_valid_time"], "%Y-%m-%d %H:%M:%S"
+            )
+            remaining = (token_valid_time - datetime.now()).total_seconds()
+            if (
+                cache_dict["access_token"]
+                and cache_dict["corpsecret"] == corpsecret
+                and remaining > 0
+            ):
+                return cache_dict["access_token"], remaining
+        except Exception as e:
+            print(f"read cache Failed: {str(e)}")
+    return None
+
+
+def _write_token_cache(corpsecret: str, access_token: str, valid_seconds: float) -> None:
+    cache = TOKEN_CACHE
+    cache.parent.mkdir(exist_ok=True)
+    _token_valid_time = (datetime.now() + timedelta(seconds=valid_seconds)).strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+    payload = json.dumps(
+        {
+            "corpsecret": corpsecret,
+            "access_token": access_token,
+            "token_valid_time": _token_valid_time,
+        },
+        separators=(",", ":"),
+    ).encode()
+    # 先写临时文件再原子替换, 进程中途退出也不会留下空的缓存文件.
+    # 每个写入方使用各自的临时文件, 多个线程 / 进程同时写入也互不干扰
+    tmp = tempfile.NamedTemporaryFile(
+        dir=cache.parent, prefix=f"{cache.name}.", suffix=".tmp", delete=False
+    )
+    try:
+        with tmp:
+            tmp.write(payload)
+        os.replace(tmp.name, cache)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+
+
+def _parse_retry_after(response: requests.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
 
 
 class WechatEnterprise:
@@ -11,10 +367,37 @@ class WechatEnterprise:
     企业微信消息推送
     """
 
-    UPLOAD_URL = "https://qyapi.weixin.qq.com/cgi-bin/media/upload"
-    SEND_URL = "https://qyapi.weixin.qq.com/cgi-bin/message/send"
-    TOKEN_URL = "https://qyapi.weixin.qq.com/cgi-bin/gettoken"
-    GET_USER_URL = "https://qyapi.weixin.qq.com/cgi-bin/user/get?access_token={ACCESS_TOKEN}&userid={USERID}"
+    __slots__ = (
+        "corpid",
+        "appid",
+        "corpsecret",
+        "session",
+        "_access_token",
+        "_token_expires_monotonic",
+        "_token_lock",
+    )
+
+    BASE_URL = "https://qyapi.weixin.qq.com/cgi-bin"
+    UPLOAD_URL = f"{BASE_URL}/media/upload"
+    SEND_URL = f"{BASE_URL}/message/send"
+    TOKEN_URL = f"{BASE_URL}/gettoken"
+    GET_USER_URL = f"{BASE_URL}/user/get"
+    GET_USERID_URL = f"{BASE_URL}/user/getuserid"
+    GET_DEPARTMENT_URL = f"{BASE_URL}/department/simplelist"
+    GET_DEPARTMENT_USERLIST_URL = f"{BASE_URL}/user/simplelist"
+    # 消息体中固定不变的字段
+    _DEFAULTS = {
+        "safe": 0,
+        "enable_id_trans": 1,
+        "enable_duplicate_check": 0,
+        "duplicate_check_interval": 1800,
+    }
+    # 单条消息 touser 最多支持 1000 个用户
+    MAX_TOUSER = 1000
+    # 超过该大小的文件以流的方式上传, 避免整个文件读入内存
+    STREAM_UPLOAD_THRESHOLD = 1024 * 1024
+    # 提前 60 秒视为过期，避免临界时刻 token 失效
+    TOKEN_EXPIRATION_BUFFER = 60
 
     def __init__(self, corpid: str, appid: str, corpsecret: str) -> None:
         """
@@ -32,28 +415,110 @@ class WechatEnterprise:
         self.corpid = corpid
         self.appid = appid
         self.corpsecret = corpsecret
-        self.access_token = self.get_access_token()
-    
+        # requests 及其依赖导入较慢, 推迟到真正创建客户端时再导入
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.session = requests.Session()
+        # 连接失败及 HTTP 429/5xx 统一由连接池重试, 重试时复用已有连接.
+        # 请求已发出后的读取错误不重试, 以免已送达的消息被重复发送
+        retry = Retry(
+            total=5,
+            read=0,
+            backoff_factor=0.5,
+            status_forcelist=sorted(RETRYABLE_STATUS_CODES),
+            allowed_methods=frozenset(["GET", "POST"]),
+            respect_retry_after_header=True,
+        )
+        self.session.mount(
+            "https://",
+            HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry),
+        )
+        self._access_token: Optional[str] = None
+        self._token_expires_monotonic: float = 0.0
+        self._token_lock = threading.Lock()
+        self.get_access_token()
+
+    @property
+    def access_token(self) -> str:
+        return self.get_access_token()
+
+    def close(self) -> None:
+        """
+        关闭底层的 HTTP 连接池
+        """
+        self.session.close()
+
+    def __enter__(self) -> WechatEnterprise:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _handle_api_response(self, response: requests.Response) -> Dict[str, Any]:
+        """
+        检查接口响应, 企业微信返回限流或系统繁忙的错误码时抛出 ``RateLimited``.
+        HTTP 429/5xx 已由 session 上挂载的 ``Retry`` 重试, 这里不再处理
+
+        Returns
+        -------
+        Dict[str, Any]
+            接口返回的 JSON
+        """
+        response.raise_for_status()
+        js: dict = _loads(response.content)
+        if js.get("errcode") in RETRYABLE_ERRCODES:
+            raise RateLimited(js.get("errmsg", ""), _parse_retry_after(response))
+        return js
+
+    def _retry(
+        self,
+        fn: Callable[[], Any],
+        *,
+        max_attempts: int = 5,
+        base: float = 1.0,
+        cap: float = 30.0,
+    ) -> Any:
+        """
+        调用 ``fn``, 遇到 ``RateLimited`` (HTTP 200 但错误码表示限流) 时
+        按指数退避加随机抖动重试, 响应中带有 ``Retry-After`` 时以其为准
+        """
+        for attempt in range(max_attempts):
+            try:
+                return fn()
+            except RateLimited as e:
+                if attempt == max_attempts - 1:
+                    raise
+                time.sleep(_backoff_delay(attempt, base, cap, e.retry_after))
+
+    def _api_get(self, url: str, **kwargs) -> Dict[str, Any]:
+        return self._retry(
+            lambda: self._handle_api_response(self.session.get(url, **kwargs))
+        )
+
+    def _api_post(self, url: str, **kwargs) -> Dict[str, Any]:
+        return self._retry(
+            lambda: self._handle_api_response(self.session.post(url, **kwargs))
+        )
+
     def get_department_id(self, ID = 0):
-        url = "https://qyapi.weixin.qq.com/cgi-bin/department/simplelist?access_token={ACCESS_TOKEN}&id={ID}"
-        response = requests.get(url.format(ACCESS_TOKEN = self.access_token, ID=ID))
-        return response.json()
+        params = {"access_token": self.access_token, "id": ID}
+        return self._api_get(self.GET_DEPARTMENT_URL, params=params)
 
     def get_department_userlist(self, department_id = 1):
-        url = "https://qyapi.weixin.qq.com/cgi-bin/user/simplelist?access_token={ACCESS_TOKEN}&department_id={DEPARTMENT_ID}"
-        response = requests.get(url.format(ACCESS_TOKEN = self.access_token, DEPARTMENT_ID = department_id))
-        return response.json()
+        params = {"access_token": self.access_token, "department_id": department_id}
+        return self._api_get(self.GET_DEPARTMENT_USERLIST_URL, params=params)
 
 
     def get_user_info(self, userid):
         """
         userid	是	成员UserID。对应管理端的账号，企业内必须唯一。不区分大小写，长度为1~64个字节, 应用须拥有指定成员的查看权限。
         """
-        url = self.GET_USER_URL.format(ACCESS_TOKEN= self.access_token,USERID = userid)
-        response = requests.get(url)
-        return response.json()
+        params = {"access_token": self.access_token, "userid": userid}
+        return self._api_get(self.GET_USER_URL, params=params)
 
-    def upload_file(self, filepath: str, filename: str) -> str:
+    def upload_file(self, filepath: str, filename: Optional[str] = None) -> str:
         """
         上传文件
 
@@ -61,8 +526,8 @@ class WechatEnterprise:
         ----------
         filepath : str
             本地文件路径
-        filename : str
-            云端存储的文件名
+        filename : str, optional
+            云端存储的文件名, 默认为本地文件名
 
         Returns
         -------
@@ -71,18 +536,35 @@ class WechatEnterprise:
         """
         access_token = self.access_token
         params = {"access_token": access_token, "type": "file"}
-        with open(filepath, "rb") as f:
-            m = MultipartEncoder(fields={"file": (filename, f, "multipart/form-data")})
-            response = requests.post(
-                url=self.UPLOAD_URL,
-                params=params,
-                data=m,
-                headers={"Content-Type": m.content_type},
-            )
-            js = response.json()
-            if js["errmsg"] != "ok":
-                return ""
-            return js["media_id"]
+        stat = os.stat(filepath)
+        name, ctype = _file_meta(str(filepath), stat.st_mtime_ns)
+        filename = filename or name
+
+        def _upload() -> Dict[str, Any]:
+            # 每次重试都需要重新打开文件, 从头读取
+            with open(filepath, "rb") as f:
+                if stat.st_size <= self.STREAM_UPLOAD_THRESHOLD:
+                    files = {"file": (filename, f, ctype)}
+                    response = self.session.post(
+                        self.UPLOAD_URL, params=params, files=files
+                    )
+                else:
+                    body = _MultipartReader(f, "file", filename, ctype)
+                    try:
+                        response = self.session.post(
+                            self.UPLOAD_URL,
+                            params=params,
+                            data=body,
+                            headers={"Content-Type": body.content_type},
+                        )
+                    finally:
+                        body.close()
+                return self._handle_api_response(response)
+
+        js = self._retry(_upload)
+        if js["errmsg"] != "ok":
+            return ""
+        return js["media_id"]
 
     def send(
         self, msg_type: str, users: List[str], content: str = None, media_id: str = None
@@ -100,10 +582,13 @@ class WechatEnterprise:
             - ``'markdown'`` Markdown 文本
             - ``'image'`` 图片
             - ``'file'`` 文件
+            - ``'voice'`` 语音
+            - ``'video'`` 视频
 
         users : List[str]
             接受消息的的用户账号列表
-            例如 ``['ZhangSan','LiSi']``
+            例如 ``['ZhangSan','LiSi']``, 重复的账号只发送一次,
+            超过 1000 个时拆分为多次请求
         content : str, optional
             消息内容, 默认为 ``None``
         media_id : str, optional
@@ -113,74 +598,99 @@ class WechatEnterprise:
         -------
         bool
             是否发送成功
+
+        Raises
+        ------
+        ValueError
+            消息类型不支持或缺少对应的 ``content`` / ``media_id`` 时
         """
-        userid_str = "|".join(users)
+        payload = _build_payload(msg_type, content, media_id)
+        uniq = list(dict.fromkeys(users))
+        if len(uniq) <= self.MAX_TOUSER:
+            return self._post_one(uniq, msg_type, payload)
+        batches = [
+            uniq[i : i + self.MAX_TOUSER] for i in range(0, len(uniq), self.MAX_TOUSER)
+        ]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(
+                    lambda batch: self._post_one(batch, msg_type, payload),
+                    batches,
+                )
+            )
+        return all(results)
+
+    def _post_one(
+        self, users: List[str], msg_type: str, payload: Dict[str, str]
+    ) -> bool:
         access_token = self.access_token
         data = {
-            "touser": userid_str,
+            **self._DEFAULTS,
+            "touser": _join_users(tuple(users)),
             "msgtype": msg_type,
             "agentid": self.appid,
-            msg_type: {"content": content, "media_id": media_id},
-            "safe": 0,
-            "enable_id_trans": 1,
-            "enable_duplicate_check": 0,
-            "duplicate_check_interval": 1800,
+            msg_type: payload,
         }
         params = {"access_token": access_token}
 
-        response = requests.post(self.SEND_URL, params=params, json=data)
-        return response.json()["errmsg"] == "ok"
+        js = self._api_post(
+            self.SEND_URL,
+            params=params,
+            data=_dumps(data),
+            headers={"Content-Type": "application/json"},
+        )
+        return js["errmsg"] == "ok"
 
     def get_access_token(self) -> str:
-        cache = Path("./tmp/cache.json")
-        cache.parent.mkdir(exist_ok=True)
-        if cache.exists():
-            try:
-                cache_dict: dict = json.loads(cache.read_text())
-                if (
-                    cache_dict["access_token"]
-                    and cache_dict["corpsecret"] == self.corpsecret
-                    and datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    <= cache_dict["token_valid_time"]
-                ):
-                    return cache_dict["access_token"]
-            except Exception as e:
-                print(f"read cache Failed: {str(e)}")
-
-        access_token = self._get_access_token()
-        ## access_token 有效期为 7200秒
-        _token_valid_time = (datetime.now() + timedelta(seconds=7190)).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
-        json.dump(
-            {
-                "corpsecret": self.corpsecret,
-                "access_token": access_token,
-                "token_valid_time": _token_valid_time,
-            },
-            cache.open(mode="w"),
-        )
+        """
+        获取 access_token, 优先使用内存缓存, 其次是 ./tmp/cache.json
+
+        Returns
+        -------
+        str
+            企业微信程序 token
+        """
+        if self._access_token and time.monotonic() < self._token_expires_monotonic:
+            return self._access_token
+        # 多线程同时发现 token 过期时只由一个线程去刷新, 其余线程等待并复用结果
+        with self._token_lock:
+            if self._access_token and time.monotonic() < self._token_expires_monotonic:
+                return self._access_token
+            return self._refresh_access_token()
+
+    def _refresh_access_token(self) -> str:
+        cached = _read_token_cache(self.corpsecret)
+        if cached is not None:
+            self._access_token, remaining = cached
+            self._token_expires_monotonic = time.monotonic() + remaining
+            return self._access_token
+
+        access_token, expires_in = self._fetch_access_token()
+        valid_seconds = expires_in - self.TOKEN_EXPIRATION_BUFFER
+        self._access_token = access_token
+        self._token_expires_monotonic = time.monotonic() + valid_seconds
+        _write_token_cache(self.corpsecret, access_token, valid_seconds)
         return access_token
 
-    def _get_access_token(self) -> str:  # sourcery skip: raise-specific-error
+    def _fetch_access_token(self) -> Tuple[str, int]:  # sourcery skip: raise-specific-error
         """
         获取企业微信应用 token
         Returns
         -------
-        str
-            企业微信程序 token
+        Tuple[str, int]
+            企业微信程序 token 及其有效期（秒）
         Raises
         ------
         Exception
             当无法获取 token 时
         """
         params = {"corpid": self.corpid, "corpsecret": self.corpsecret}
-        response = requests.get(self.TOKEN_URL, params=params)
-        js: dict = response.json()
+        js = self._api_get(self.TOKEN_URL, params=params)
         access_token = js.get("access_token")
         if access_token is None:
             raise Exception("获取 token 失败，请确保相关信息填写正确")
-        return access_token
+        ## access_token 有效期默认为 7200秒
+        return access_token, int(js.get("expires_in", 7200))
 
     def send_image(self, image_path: str, users: List[str]) -> bool:
         """
@@ -193,7 +703,7 @@ class WechatEnterprise:
         users : List[str]
             接受消息的的用户账号列表
         """
-        media_id = self.upload_file(image_path, Path(image_path).name)
+        media_id = self.upload_file(image_path)
         return self.send(msg_type="image", users=users, media_id=media_id)
 
     def send_file(self, file_path: str, users: List[str]) -> bool:
@@ -207,7 +717,7 @@ class WechatEnterprise:
         users : List[str]
             接受消息的用户账号列表
         """
-        media_id = self.upload_file(file_path, Path(file_path).name)
+        media_id = self.upload_file(file_path)
         return self.send(msg_type="file", users=users, media_id=media_id)
 
     def send_text(self, content: str, users: List[str]) -> bool:
@@ -236,13 +746,75 @@ class WechatEnterprise:
         """
         return self.send(msg_type="markdown", users=users, content=content)
 
+    def send_batch(
+        self,
+        messages: List[Message],
+        users: Optional[List[str]] = None,
+        coalesce_markdown: bool = False,
+    ) -> List[bool]:
+        """
+        批量发送消息, 按接收者分组后并发发送
+
+        Parameters
+        ----------
+        messages : List[Message]
+            待发送的消息列表
+        users : List[str], optional
+            消息未指定 ``users`` 时使用的用户账号列表
+        coalesce_markdown : bool, optional
+            为 ``True`` 时, 同一组接收者的纯文本 / Markdown 消息会合并成
+            Markdown 消息发送, 每条合并后的内容不超过 2048 字节
+            (只有一条时保持原消息类型), 默认为 ``False``
+
+        Returns
+        -------
+        List[bool]
+            与 ``messages`` 一一对应的发送结果. 某一组请求出错 (如重试耗尽、
+            连接中断) 时只把该组对应的消息记为 ``False``, 其余组的结果不受影响,
+            调用方只需重发结果为 ``False`` 的消息
+
+        Raises
+        ------
+        ValueError
+            消息未指定接收者或内容不合法时, 此时不会发送任何消息
+        """
+        plan = _plan_batch(messages, users, coalesce_markdown)
+        results: List[bool] = [False] * len(messages)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                (indexes, executor.submit(self.send, **kwargs)) for indexes, kwargs in plan
+            ]
+            for indexes, future in futures:
+                try:
+                    ok = future.result()
+                except Exception as e:
+                    print(f"send failed: {str(e)}")
+                    ok = False
+                for i in indexes:
+                    results[i] = ok
+        return results
+
     def get_userid(self, telephone):
-        url = "https://qyapi.weixin.qq.com/cgi-bin//user/getuserid?access_token={}".format(self.get_access_token())
-        headers = {'Content-Type': 'application/json'}
-        body = {'mobile': telephone}
-        response = requests.post(url, data=json.dumps(body), headers=headers)
-        res = response.json()
+        params = {"access_token": self.get_access_token()}
+        res = self._api_post(self.GET_USERID_URL, params=params, json={"mobile": telephone})
         if res['errmsg'] == 'ok':
             return res.get("userid")
         else:
             raise Exception(res['errmsg'])
+
+    def get_userids(self, telephones: List[str]) -> List[str]:
+        """
+        根据多个手机号并发获取企业微信账号
+
+        Parameters
+        ----------
+        telephones : List[str]
+            手机号列表
+
+        Returns
+        -------
+        List[str]
+            与 ``telephones`` 一一对应的用户账号
+        """
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            return list(executor.map(self.get_userid, telephones))